@@ -0,0 +1,14 @@
+"""
+Makes the markitdown package in this checkout importable
+
+Imported by the test scripts in this directory (and by conftest.py for
+pytest), so they run against the source without installing it.
+"""
+
+import sys
+from pathlib import Path
+
+# Add the markitdown package to the path (once, however many scripts import this)
+markitdown_path = str(Path(__file__).parent / "markitdown-image-seperator/packages/markitdown/src")
+if markitdown_path not in sys.path:
+    sys.path.insert(0, markitdown_path)
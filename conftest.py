@@ -0,0 +1,6 @@
+"""
+pytest setup for the test scripts in this directory
+"""
+
+# Puts the markitdown package on the path before the tests are collected
+import _paths  # noqa: F401
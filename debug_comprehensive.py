@@ -8,55 +8,102 @@ This script creates a test scenario to verify:
 3. References file is created
 """
 
+import functools
+import hashlib
+import inspect
 import os
 import sys
 import tempfile
+import traceback
 from pathlib import Path
 
 # Add the markitdown package to the path
 markitdown_path = Path(__file__).parent / "markitdown-image-seperator/packages/markitdown/src"
 sys.path.insert(0, str(markitdown_path))
 
-def create_test_pdf_with_text():
-    """Create a simple test PDF with figure references."""
-    try:
-        import fitz  # PyMuPDF
-        
-        # Create a new PDF
-        doc = fitz.open()
-        
-        # Page 1
+# (test name, exception) for each failed test; tracebacks are printed after the summary
+_FAILURES = []
+
+# Text of the test PDF as (page index, baseline origin, text, font size)
+_FIXTURE_LAYOUT = [
+    # Page 1
+    (0, (50, 50), "Test Paper", 20),
+    (0, (50, 100), "This is a test paper with Figure 1 and Table 1.", 12),
+    (0, (50, 150), "Figure 1 shows the test results.", 12),
+    (0, (50, 200), "The data is summarized in Table 1.", 12),
+    (0, (55, 270), "Figure 1: Test Figure", 10),
+    # Page 2
+    (1, (50, 50), "Table 1: Test Data", 14),
+    (1, (50, 100), "Value 1: 10", 12),
+    (1, (50, 130), "Value 2: 20", 12),
+    # References section
+    (1, (50, 300), "REFERENCES", 16),
+    (1, (50, 350), "[1] Test Reference 1", 10),
+    (1, (50, 370), "[2] Test Reference 2", 10),
+]
+
+@functools.lru_cache(maxsize=1)
+def _build_fixture_bytes():
+    """Build the test PDF in memory and return its bytes."""
+    import fitz  # PyMuPDF
+    
+    # Create a new PDF
+    doc = fitz.open()
+    
+    lines_by_page = [[] for _ in range(1 + max(entry[0] for entry in _FIXTURE_LAYOUT))]
+    for page_index, origin, text, fontsize in _FIXTURE_LAYOUT:
+        lines_by_page[page_index].append((origin, text, fontsize))
+    
+    # Each page is finished before the next one is added, since adding a page
+    # invalidates earlier Page objects
+    for page_index, lines in enumerate(lines_by_page):
         page = doc.new_page()
-        page.insert_text((50, 50), "Test Paper", fontsize=20)
-        page.insert_text((50, 100), "This is a test paper with Figure 1 and Table 1.", fontsize=12)
-        page.insert_text((50, 150), "Figure 1 shows the test results.", fontsize=12)
-        page.insert_text((50, 200), "The data is summarized in Table 1.", fontsize=12)
-        
-        # Add a simple rectangle to represent a figure
-        page.draw_rect(fitz.Rect(50, 250, 200, 350), color=(0, 0, 1), width=2)
-        page.insert_text((55, 270), "Figure 1: Test Figure", fontsize=10)
         
-        # Page 2
-        page2 = doc.new_page()
-        page2.insert_text((50, 50), "Table 1: Test Data", fontsize=14)
-        page2.insert_text((50, 100), "Value 1: 10", fontsize=12)
-        page2.insert_text((50, 130), "Value 2: 20", fontsize=12)
-        
-        # Add references section
-        page2.insert_text((50, 300), "REFERENCES", fontsize=16)
-        page2.insert_text((50, 350), "[1] Test Reference 1", fontsize=10)
-        page2.insert_text((50, 370), "[2] Test Reference 2", fontsize=10)
-        
-        # Save to temporary file
-        temp_pdf = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
-        doc.save(temp_pdf.name)
-        doc.close()
-        
-        return temp_pdf.name
+        if page_index == 0:
+            # Add a simple rectangle to represent a figure
+            page.draw_rect(fitz.Rect(50, 250, 200, 350), color=(0, 0, 1), width=2)
         
+        # Text is collected in one TextWriter per page and written to the page's
+        # content stream once, instead of once per line
+        writer = fitz.TextWriter(page.rect)
+        append = writer.append
+        for origin, text, fontsize in lines:
+            append(origin, text, fontsize=fontsize)
+        writer.write_text(page)
+    
+    data = doc.tobytes()
+    doc.close()
+    
+    return data
+
+def _fixture_cache_path():
+    """Location of the cached test PDF, keyed by a hash of the code and layout that build it."""
+    source = inspect.getsource(_build_fixture_bytes) + repr(_FIXTURE_LAYOUT)
+    key = hashlib.sha1(source.encode()).hexdigest()
+    return Path(tempfile.gettempdir()) / f"mkid_fixture_{key}.pdf"
+
+def create_test_pdf_with_text():
+    """Create a simple test PDF with figure references and return its bytes.
+    
+    The PDF is only built when no cached copy exists, so repeated calls (and
+    repeated runs) reuse the same file.
+    """
+    cache_path = _fixture_cache_path()
+    if cache_path.exists():
+        return cache_path.read_bytes()
+    
+    try:
+        data = _build_fixture_bytes()
     except ImportError:
         print("❌ PyMuPDF not available, cannot create test PDF")
         return None
+    
+    # Write under a temporary name first so a concurrent run never sees a partial file
+    temp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+    temp_path.write_bytes(data)
+    os.replace(temp_path, cache_path)
+    
+    return data
 
 def test_text_detection():
     """Test text detection with our test PDF."""
@@ -64,28 +111,26 @@ def test_text_detection():
     print("🔍 Testing Text Detection")
     print("-" * 30)
     
-    test_pdf = create_test_pdf_with_text()
-    if not test_pdf:
+    pdf_bytes = create_test_pdf_with_text()
+    if not pdf_bytes:
         print("❌ Cannot create test PDF")
         return False
     
     try:
         from markitdown.converters._pdf_enhanced_converter import PDFImageExtractor
         
-        output_dir = tempfile.mkdtemp()
-        extractor = PDFImageExtractor(test_pdf, output_dir)
-        
-        # Test detection
-        detected_items = extractor.detect_figures_and_tables()
-        
-        print(f"✅ Detected {len(detected_items)} references:")
-        for item in detected_items:
-            print(f"  - {item['display_name']} on page {item['page'] + 1}")
-        
-        # Clean up
-        os.unlink(test_pdf)
-        
-        return len(detected_items) > 0
+        with tempfile.TemporaryDirectory() as output_dir:
+            extractor = PDFImageExtractor(pdf_bytes, output_dir)
+            
+            # Test detection
+            detected_items = extractor.detect_figures_and_tables()
+            
+            # Emit the whole listing with a single write instead of one print per item
+            lines = [f"✅ Detected {len(detected_items)} references:"]
+            lines.extend(f"  - {item['display_name']} on page {item['page'] + 1}" for item in detected_items)
+            sys.stdout.write("\n".join(lines) + "\n")
+            
+            return len(detected_items) > 0
         
     except Exception as e:
         print(f"❌ Error in text detection: {e}")
@@ -141,38 +186,42 @@ REFERENCES
         print("🔄 Processing text with images...")
         processed_text = converter._process_text_with_images(test_text, filename_map, selected_items)
         
-        # Check if images were inserted
+        # Check if images were inserted (results are collected and written in one go)
+        report = []
         if '![Figure 1](./images/figure1.png)' in processed_text:
-            print("✅ Figure 1 reference inserted correctly")
+            report.append("✅ Figure 1 reference inserted correctly")
         else:
-            print("❌ Figure 1 reference not found")
+            report.append("❌ Figure 1 reference not found")
             
         if '![Table 1](./images/table1.png)' in processed_text:
-            print("✅ Table 1 reference inserted correctly")
+            report.append("✅ Table 1 reference inserted correctly")
         else:
-            print("❌ Table 1 reference not found")
+            report.append("❌ Table 1 reference not found")
+        
+        sys.stdout.write("\n".join(report) + "\n")
         
         # Test references separation
         print("\n🔄 Testing references separation...")
         main_text, references_text = converter._separate_references(processed_text)
         
+        report = []
         if references_text:
-            print("✅ References section found and separated")
-            print(f"   References length: {len(references_text)} characters")
+            report.append("✅ References section found and separated")
+            report.append(f"   References length: {len(references_text)} characters")
         else:
-            print("❌ References section not found")
+            report.append("❌ References section not found")
         
         # Show processed text sample
-        print("\n📄 Processed text sample:")
-        print("-" * 20)
-        print(processed_text[:300] + "..." if len(processed_text) > 300 else processed_text)
+        report.append("\n📄 Processed text sample:")
+        report.append("-" * 20)
+        report.append(f"{processed_text[:300]}{'...' if len(processed_text) > 300 else ''}")
+        sys.stdout.write("\n".join(report) + "\n")
         
         return True
         
     except Exception as e:
         print(f"❌ Error in markdown processing: {e}")
-        import traceback
-        traceback.print_exc()
+        _FAILURES.append(("test_markdown_processing", e))
         return False
 
 def test_full_workflow():
@@ -181,8 +230,8 @@ def test_full_workflow():
     print("\n🔄 Testing Full Workflow")
     print("-" * 30)
     
-    test_pdf = create_test_pdf_with_text()
-    if not test_pdf:
+    pdf_bytes = create_test_pdf_with_text()
+    if not pdf_bytes:
         print("❌ Cannot create test PDF")
         return False
     
@@ -190,27 +239,23 @@ def test_full_workflow():
         from markitdown import MarkItDown
         from markitdown.converters._pdf_enhanced_converter import EnhancedPdfConverter
         
-        # Create output directory
-        output_dir = tempfile.mkdtemp()
-        print(f"📁 Output directory: {output_dir}")
-        
-        # Initialize converter
-        markitdown = MarkItDown()
-        enhanced_converter = EnhancedPdfConverter()
-        markitdown.register_converter(enhanced_converter, priority=0.0)
-        
-        # NOTE: This would normally show the GUI, but we'll skip for testing
-        print("ℹ️  In a real scenario, the GUI would appear here for manual selection")
-        
-        # Clean up
-        os.unlink(test_pdf)
-        
-        return True
+        # Create output directory (removed again when the test finishes)
+        with tempfile.TemporaryDirectory() as output_dir:
+            print(f"📁 Output directory: {output_dir}")
+            
+            # Initialize converter
+            markitdown = MarkItDown()
+            enhanced_converter = EnhancedPdfConverter()
+            markitdown.register_converter(enhanced_converter, priority=0.0)
+            
+            # NOTE: This would normally show the GUI, but we'll skip for testing
+            print("ℹ️  In a real scenario, the GUI would appear here for manual selection")
+            
+            return True
         
     except Exception as e:
         print(f"❌ Error in full workflow: {e}")
-        import traceback
-        traceback.print_exc()
+        _FAILURES.append(("test_full_workflow", e))
         return False
 
 def main():
@@ -246,6 +291,10 @@ def main():
     print("2. ✅ Rectangle selection should clear when reselecting")
     print("3. ✅ References file should be created if REFERENCES section exists")
     
+    for test_name, exc in _FAILURES:
+        print(f"\n💥 Traceback from {test_name}:")
+        traceback.print_exception(type(exc), exc, exc.__traceback__)
+    
     return success_count == total_tests
 
 if __name__ == "__main__":
@@ -6,6 +6,8 @@ This script shows various ways to use the enhanced PDF converter
 for extracting figures and tables from academic PDFs.
 """
 
+import functools
+import importlib.util
 import os
 import sys
 from pathlib import Path
@@ -14,8 +16,22 @@ from pathlib import Path
 markitdown_path = Path(__file__).parent / "markitdown-image-seperator/packages/markitdown/src"
 sys.path.insert(0, str(markitdown_path))
 
-from markitdown import MarkItDown
-from markitdown.converters import EnhancedPdfConverter
+@functools.lru_cache(maxsize=1)
+def _get_markitdown():
+    """Return a MarkItDown instance with the enhanced PDF converter registered.
+    
+    The instance is built on first use and shared by every example (and every
+    PDF of a batch). MarkItDown and the enhanced converter pull in PyMuPDF and
+    friends, so they are imported here rather than at module load.
+    """
+    from markitdown import MarkItDown
+    from markitdown.converters import EnhancedPdfConverter
+    
+    markitdown = MarkItDown()
+    
+    # Register the enhanced converter (replaces default PDF converter)
+    markitdown.register_converter(EnhancedPdfConverter(), priority=0.0)
+    return markitdown
 
 def basic_usage():
     """Basic usage example with interactive selection."""
@@ -23,12 +39,8 @@ def basic_usage():
     print("📚 Basic Usage Example")
     print("-" * 30)
     
-    # Initialize MarkItDown with enhanced converter
-    markitdown = MarkItDown()
-    
-    # Register the enhanced converter (replaces default PDF converter)
-    enhanced_converter = EnhancedPdfConverter()
-    markitdown.register_converter(enhanced_converter, priority=0.0)
+    # MarkItDown with the enhanced converter registered
+    markitdown = _get_markitdown()
     
     # Convert PDF with interactive selection
     output_dir = "./paper_output"
@@ -45,8 +57,7 @@ def basic_usage():
         print(f"📄 Content length: {len(result.markdown)} characters")
         
         # Save the main content
-        with open(f"{output_dir}/converted.md", "w", encoding="utf-8") as f:
-            f.write(result.markdown)
+        Path(output_dir, "converted.md").write_text(result.markdown, encoding="utf-8")
         
         print(f"💾 Output saved to: {output_dir}/")
         
@@ -55,40 +66,48 @@ def basic_usage():
     except Exception as e:
         print(f"❌ Error: {e}")
 
+def _convert_one(pdf_file):
+    """Convert a single PDF of a batch; returns (paper_name, error or None)."""
+    paper_name = Path(pdf_file).stem
+    output_dir = f"converted/{paper_name}"
+    
+    try:
+        result = _get_markitdown().convert(pdf_file, output_dir=output_dir)
+        
+        # Save main content
+        Path(output_dir, f"{paper_name}-converted.md").write_text(result.markdown, encoding="utf-8")
+    except Exception as e:
+        return paper_name, str(e)
+    
+    return paper_name, None
+
 def batch_processing():
     """Example of batch processing multiple PDFs."""
     
     print("\n📦 Batch Processing Example")
     print("-" * 30)
     
-    import glob
-    
-    # Initialize converter
-    markitdown = MarkItDown()
-    enhanced_converter = EnhancedPdfConverter()
-    markitdown.register_converter(enhanced_converter, priority=0.0)
-    
-    # Process all PDFs in a directory
-    pdf_files = glob.glob("papers/*.pdf")
+    # Process all PDFs in a directory (scandir reads entry types without extra stat calls)
+    pdf_files = []
+    if os.path.isdir("papers"):
+        with os.scandir("papers") as entries:
+            pdf_files = [
+                entry.path for entry in entries
+                if entry.name.endswith(".pdf") and entry.is_file(follow_symlinks=False)
+            ]
     
     if not pdf_files:
         print("❌ No PDF files found in 'papers/' directory")
         return
     
+    # One PDF at a time: every conversion opens the interactive selection
+    # window, and running them in parallel would open several at once
     for pdf_file in pdf_files:
-        paper_name = Path(pdf_file).stem
-        output_dir = f"converted/{paper_name}"
-        
-        try:
-            result = markitdown.convert(pdf_file, output_dir=output_dir)
+        paper_name, error = _convert_one(pdf_file)
+        if error is None:
             print(f"✅ Processed: {paper_name}")
-            
-            # Save main content
-            with open(f"{output_dir}/{paper_name}-converted.md", "w", encoding="utf-8") as f:
-                f.write(result.markdown)
-                
-        except Exception as e:
-            print(f"❌ Failed to process {paper_name}: {e}")
+        else:
+            print(f"❌ Failed to process {paper_name}: {error}")
 
 def advanced_configuration():
     """Example with advanced configuration options."""
@@ -96,10 +115,7 @@ def advanced_configuration():
     print("\n⚙️  Advanced Configuration Example")
     print("-" * 30)
     
-    # Initialize with custom configuration
-    markitdown = MarkItDown()
-    enhanced_converter = EnhancedPdfConverter()
-    markitdown.register_converter(enhanced_converter, priority=0.0)
+    markitdown = _get_markitdown()
     
     # Custom configuration
     config = {
@@ -120,8 +136,7 @@ def advanced_configuration():
         output_dir = Path(config["output_dir"])
         
         # Main content
-        with open(output_dir / f"{base_name}-converted.md", "w", encoding="utf-8") as f:
-            f.write(result.markdown)
+        (output_dir / f"{base_name}-converted.md").write_text(result.markdown, encoding="utf-8")
         
         print(f"💾 Advanced output saved to: {config['output_dir']}/")
         
@@ -136,9 +151,7 @@ def headless_mode():
     print("\n🤖 Headless Mode Example")
     print("-" * 30)
     
-    markitdown = MarkItDown()
-    enhanced_converter = EnhancedPdfConverter()
-    markitdown.register_converter(enhanced_converter, priority=0.0)
+    markitdown = _get_markitdown()
     
     # Auto-select all detected items (no GUI)
     config = {
@@ -153,8 +166,7 @@ def headless_mode():
         print(f"✅ Headless conversion completed!")
         print(f"📄 Auto-extracted all detected figures and tables")
         
-        with open(f"{config['output_dir']}/converted.md", "w", encoding="utf-8") as f:
-            f.write(result.markdown)
+        Path(config["output_dir"], "converted.md").write_text(result.markdown, encoding="utf-8")
         
         print(f"💾 Headless output saved to: {config['output_dir']}/")
         
@@ -163,6 +175,11 @@ def headless_mode():
     except Exception as e:
         print(f"❌ Error: {e}")
 
+@functools.lru_cache(maxsize=None)
+def _is_installed(import_name):
+    """Whether a module can be imported, checked without importing it."""
+    return importlib.util.find_spec(import_name) is not None
+
 def check_dependencies():
     """Check if all required dependencies are installed."""
     
@@ -179,10 +196,9 @@ def check_dependencies():
     all_good = True
     
     for dep_name, import_name in dependencies:
-        try:
-            __import__(import_name)
+        if _is_installed(import_name):
             print(f"✅ {dep_name}")
-        except ImportError:
+        else:
             print(f"❌ {dep_name} - Install with: pip install {dep_name}")
             all_good = False
     
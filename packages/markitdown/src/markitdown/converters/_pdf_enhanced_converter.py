@@ -2,9 +2,12 @@ import sys
 import io
 import os
 import re
+import functools
+import logging
 import tempfile
+from collections import OrderedDict, defaultdict
 from pathlib import Path
-from typing import BinaryIO, Any, List, Tuple, Optional, Dict
+from typing import BinaryIO, Any, Iterator, List, Tuple, Optional, Dict, Union
 import tkinter as tk
 from tkinter import messagebox, simpledialog
 from PIL import Image, ImageTk, ImageDraw
@@ -18,14 +21,14 @@ from .._exceptions import MissingDependencyException, MISSING_DEPENDENCY_MESSAGE
 # Save reporting of any exceptions for later
 _dependency_exc_info = None
 try:
-    import pdfminer
-    import pdfminer.high_level
     import fitz  # PyMuPDF
 except ImportError:
     # Preserve the error and stack trace for later
     _dependency_exc_info = sys.exc_info()
 
 
+logger = logging.getLogger(__name__)
+
 ACCEPTED_MIME_TYPE_PREFIXES = [
     "application/pdf",
     "application/x-pdf",
@@ -33,12 +36,219 @@ ACCEPTED_MIME_TYPE_PREFIXES = [
 
 ACCEPTED_FILE_EXTENSIONS = [".pdf"]
 
+# Headings that open the references section, tried in order of how reliably they
+# mark it. Each pattern is anchored to a single line, so a scan is linear in the
+# length of the text. Besides blanks, the heading's line may hold the form feed
+# that pdfminer ends each page with, and a carriage return.
+_REFERENCE_SECTION_PATTERNS = [
+    re.compile(r"\n[ \t\f\r]*REFERENCES[ \t\f\r]*$", re.IGNORECASE | re.MULTILINE),
+    re.compile(r"\n[ \t\f\r]*BIBLIOGRAPH(?:Y|IE)[ \t\f\r]*$", re.IGNORECASE | re.MULTILINE),
+]
+
+# Figure/image/table references such as "Figure 1", "Image 3" or "Table 2.1",
+# matched in a single pass over the text
+_FIGURE_TABLE_RE = re.compile(r'\b(figure|image|table)\s+(\d+(?:\.\d+)?)\b', re.IGNORECASE)
+
+# Numeric part of a suggested name, so that "figure2" sorts before "figure10"
+_ITEM_NUMBER_RE = re.compile(r'(\d+(?:\.\d+)?)')
+
+# Markers of metadata lines (DOI, volume, page numbers...) that are not a title
+_METADATA_MARKER_RE = re.compile(r'doi:|arxiv:|volume|page', re.IGNORECASE)
+
+# Number of pages whose display lists (and, in the selection window, rendered
+# tiles) are kept; the least recently used page is dropped first
+_PAGE_CACHE_SIZE = 8
+
+# A caption opening a text block, such as "Figure 3: ..." or "Table 2. ..."
+_CAPTION_RE = re.compile(r'\s*(figure|image|table)\s+(\d+(?:\.\d+)?)\s*[:.]', re.IGNORECASE)
+
+
+# Largest vertical gap (in points) between the parts of a table, such as a
+# ruling line and the row of text below it
+_TABLE_PART_GAP = 36
+
+# Text blocks of at least this many words above a figure are body text, which
+# bounds the figure; shorter ones are taken as its labels and legends
+_BODY_TEXT_MIN_WORDS = 8
+
+
+def _union(rects: List["fitz.Rect"]) -> Optional["fitz.Rect"]:
+    """Bounding box of the rects, or None if there are none.
+    
+    Computed coordinate-wise, as fitz's "|" drops zero-width and zero-height
+    rects such as axis lines, ticks and ruling lines.
+    """
+    if not rects:
+        return None
+    return fitz.Rect(
+        min(r.x0 for r in rects), min(r.y0 for r in rects),
+        max(r.x1 for r in rects), max(r.y1 for r in rects),
+    )
+
+
+def _propose_region(
+    caption: "fitz.Rect",
+    graphics: List["fitz.Rect"],
+    above: bool,
+    text_blocks: List[Tuple["fitz.Rect", str]] = (),
+    page_rect: Optional["fitz.Rect"] = None,
+) -> Optional["fitz.Rect"]:
+    """Propose the region of the figure or table that a caption belongs to.
+    
+    A figure (above=True) is everything between its caption and the text above
+    it, see _propose_figure_region. A table (above=False) runs from its caption
+    down to the last graphic of the column below it, see _propose_table_region.
+    Returns None if no non-empty region is found.
+    """
+    if above:
+        region = _propose_figure_region(caption, graphics, text_blocks, page_rect)
+    else:
+        region = _propose_table_region(caption, graphics, text_blocks)
+    
+    # A lone ruling line has no height; there is nothing to extract from it
+    if region is None or region.is_empty or region.width <= 0 or region.height <= 0:
+        return None
+    return region
+
+
+def _propose_figure_region(
+    caption: "fitz.Rect",
+    graphics: List["fitz.Rect"],
+    text_blocks: List[Tuple["fitz.Rect", str]],
+    page_rect: Optional["fitz.Rect"] = None,
+) -> Optional["fitz.Rect"]:
+    """Span a figure from its caption up to the preceding caption or body text in the column.
+    
+    The region is the union of the graphics (images and vector drawings) and
+    the other text blocks (axis labels, legends) within that span, so the
+    parts of a chart or scatter plot need not touch each other. Returns None
+    if there is no graphic in the span.
+    """
+    # The figure starts below the nearest caption or body text above its caption
+    top_block = None
+    labels = []
+    for rect, text in text_blocks:
+        if rect.y1 > caption.y0 + 2 or rect == caption:
+            continue
+        if _CAPTION_RE.match(text) or len(text.split()) >= _BODY_TEXT_MIN_WORDS:
+            if rect.x0 < caption.x1 and rect.x1 > caption.x0 and (top_block is None or rect.y1 > top_block.y1):
+                top_block = rect
+        else:
+            labels.append(rect)
+    
+    top = 0 if top_block is None else top_block.y1
+    
+    # When the caption and the text bounding the figure both sit in one half of
+    # the page (a two-column layout), the figure is kept to that half;
+    # otherwise it may take the full width of the page
+    column_x0, column_x1 = float("-inf"), float("inf")
+    if page_rect is not None:
+        middle = (page_rect.x0 + page_rect.x1) / 2
+        bounds = [caption] if top_block is None else [caption, top_block]
+        if all(r.x1 <= middle for r in bounds):
+            column_x1 = middle
+        elif all(r.x0 >= middle for r in bounds):
+            column_x0 = middle
+    
+    def in_figure(rect):
+        return (
+            rect.y0 >= top - 2 and rect.y1 <= caption.y0 + 2
+            and rect.x0 < column_x1 and rect.x1 > column_x0
+        )
+    
+    parts = [rect for rect in graphics if in_figure(rect)]
+    if not parts:
+        return None
+    parts.extend(rect for rect in labels if in_figure(rect))
+    return _union(parts)
+
+
+def _propose_table_region(
+    caption: "fitz.Rect",
+    graphics: List["fitz.Rect"],
+    text_blocks: List[Tuple["fitz.Rect", str]],
+) -> Optional["fitz.Rect"]:
+    """Span a table from its caption down to the last graphic in the same column.
+    
+    Walks the graphics and text blocks below the caption top to bottom while
+    they follow each other without a gap larger than _TABLE_PART_GAP, and stops
+    at the next caption. The region covers everything up to the last graphic
+    (typically the bottom rule), so the rows of text between the rules are
+    included and the text following the table is not.
+    """
+    parts = [(rect, True) for rect in graphics]
+    for rect, text in text_blocks:
+        if rect == caption:
+            continue
+        if _CAPTION_RE.match(text):
+            parts.append((rect, None))  # Marks where the next item starts
+        else:
+            parts.append((rect, False))
+    parts = [(rect, kind) for rect, kind in parts if rect.y0 >= caption.y1 - 2]
+    parts.sort(key=lambda part: part[0].y0)
+    
+    # The column widens as graphics are taken in, so cells outside the
+    # caption's width are still picked up under a wide table
+    column_x0, column_x1 = caption.x0, caption.x1
+    bottom = caption.y1
+    region = None
+    pending = []  # Text blocks seen since the last graphic
+    for rect, is_graphic in parts:
+        if not (rect.x0 < column_x1 and rect.x1 > column_x0):
+            continue
+        if rect.y0 - bottom > _TABLE_PART_GAP or is_graphic is None:
+            break
+        bottom = max(bottom, rect.y1)
+        if is_graphic:
+            region = _union(pending + [rect] + ([region] if region is not None else []))
+            pending = []
+            column_x0, column_x1 = min(column_x0, rect.x0), max(column_x1, rect.x1)
+        else:
+            pending.append(rect)
+    
+    return region
+
+
+@functools.lru_cache(maxsize=32)
+def _compile_reference_pattern(variants: Tuple[str, ...]) -> "re.Pattern[str]":
+    """Compile one case-insensitive pattern matching any of the names as a whole word.
+    
+    Each name gets its own named group, g0, g1, ... in the order given, so the
+    match's lastgroup tells which name was found. Cached, so documents that share
+    figure/table names reuse the compiled pattern.
+    """
+    alternatives = '|'.join(f'(?P<g{i}>{re.escape(v)})' for i, v in enumerate(variants))
+    return re.compile(rf'\b(?:{alternatives})\b', re.IGNORECASE)
+
+
+def _find_whole_word(text: str, word: str) -> Tuple[int, int]:
+    """Return the (start, end) of the first occurrence of word in text as a whole word, or (-1, -1).
+    
+    A literal search that gives the same result as searching for the word
+    between \\b anchors.
+    """
+    start = text.find(word)
+    while start != -1:
+        end = start + len(word)
+        before_ok = start == 0 or not (text[start - 1].isalnum() or text[start - 1] == '_')
+        after_ok = end == len(text) or not (text[end].isalnum() or text[end] == '_')
+        if before_ok and after_ok:
+            return start, end
+        start = text.find(word, start + 1)
+    return -1, -1
+
 
 class PDFImageExtractor:
     """Handles PDF image and figure extraction with interactive selection."""
     
-    def __init__(self, pdf_path: str, output_dir: str):
-        self.pdf_path = pdf_path
+    def __init__(self, pdf_source: Union[str, bytes], output_dir: str):
+        # The PDF can be given as a path on disk or as its raw bytes
+        if isinstance(pdf_source, (bytes, bytearray)):
+            self.pdf_path = None
+            self.pdf_bytes = bytes(pdf_source)
+        else:
+            self.pdf_path = pdf_source
+            self.pdf_bytes = None
         self.output_dir = output_dir
         self.images_dir = os.path.join(output_dir, "images")
         os.makedirs(self.images_dir, exist_ok=True)
@@ -47,50 +257,139 @@ class PDFImageExtractor:
         self.detected_items: List[Dict] = []
         self.selected_items: List[Dict] = []
         
+        # Opened on first use and shared by detection, preview and extraction
+        self._doc = None
+        
+        # Display lists of the most recently used pages, shared by preview and
+        # extraction; the oldest is dropped beyond _PAGE_CACHE_SIZE pages
+        self._displaylists: "OrderedDict[int, fitz.DisplayList]" = OrderedDict()
+        
+        # Text blocks of each page read so far, shared by text extraction and detection
+        self._blocks: Dict[int, List[Tuple]] = {}
+    
+    def _open_document(self):
+        """Open the PDF from memory if we have its bytes, otherwise from disk."""
+        if self.pdf_bytes is not None:
+            return fitz.open(stream=self.pdf_bytes, filetype="pdf")
+        return fitz.open(self.pdf_path)
+    
+    @property
+    def doc(self):
+        """The PDF document, parsed once per extractor."""
+        if self._doc is None:
+            self._doc = self._open_document()
+        return self._doc
+    
+    def get_displaylist(self, page_num: int) -> "fitz.DisplayList":
+        """Return the page's display list, recording the page's drawing commands on first use.
+        
+        A display list can be rasterized at any zoom and clip without parsing
+        the page again.
+        """
+        displaylist = self._displaylists.get(page_num)
+        if displaylist is not None:
+            self._displaylists.move_to_end(page_num)
+        else:
+            displaylist = self.doc[page_num].get_displaylist()
+            self._displaylists[page_num] = displaylist
+            if len(self._displaylists) > _PAGE_CACHE_SIZE:
+                self._displaylists.popitem(last=False)
+        return displaylist
+    
+    def get_blocks(self, page_num: int) -> List[Tuple]:
+        """Return the page's blocks as (x0, y0, x1, y1, text, block_no, block_type) tuples, read on first use."""
+        blocks = self._blocks.get(page_num)
+        if blocks is None:
+            blocks = self.doc[page_num].get_text("blocks")
+            self._blocks[page_num] = blocks
+        return blocks
+    
+    def iter_text(self) -> Iterator[str]:
+        """Yield the plain text of each page in turn.
+        
+        Each text block becomes its own paragraph, separated by a blank line,
+        and every page ends with a blank line.
+        """
+        for page_num in range(len(self.doc)):
+            # Block type 0 is text; type 1 blocks stand for images
+            texts = [block[4].strip() for block in self.get_blocks(page_num) if block[6] == 0]
+            yield "\n\n".join(text for text in texts if text) + "\n\n"
+    
+    def close(self) -> None:
+        """Close the PDF document if it was opened."""
+        if self._doc is not None:
+            self._displaylists.clear()
+            self._blocks.clear()
+            self._doc.close()
+            self._doc = None
+        
     def detect_figures_and_tables(self) -> List[Dict]:
         """Detect text references to figures, images, and tables in the PDF."""
-        doc = fitz.open(self.pdf_path)
+        doc = self.doc
         detected_items = []
-        
-        # Patterns to match figure/table references
-        patterns = [
-            r'\bFigure\s+(\d+(?:\.\d+)?)\b',  # Figure 1, Figure 2.1, etc.
-            r'\bImage\s+(\d+(?:\.\d+)?)\b',   # Image 1, Image 2.1, etc.
-            r'\bTable\s+(\d+(?:\.\d+)?)\b',   # Table 1, Table 2.1, etc.
-        ]
+        items_by_name = {}  # suggested name -> its entry in detected_items
         
         for page_num in range(len(doc)):
             page = doc[page_num]
-            text = page.get_text()
+            graphics = None  # Images and drawings on the page, collected on first caption
             
-            # Find all references to figures, images, and tables
-            for pattern in patterns:
-                matches = re.finditer(pattern, text, re.IGNORECASE)
-                for match in matches:
-                    ref_type = match.group(0).split()[0].lower()  # figure, image, or table
-                    ref_number = match.group(1)  # the number part
+            # Text blocks carry their position, so one pass over them finds both
+            # the references and the captions to place regions next to
+            blocks = self.get_blocks(page_num)
+            text_blocks = None  # (rect, text) of each text block, built on first caption
+            for block in blocks:
+                text = block[4]
+                
+                # Find all references to figures, images, and tables
+                for match in _FIGURE_TABLE_RE.finditer(text):
+                    ref_type = match.group(1).lower()  # figure, image, or table
+                    ref_number = match.group(2)  # the number part
                     
                     # Create a proper name based on actual text
                     proper_name = f"{ref_type}{ref_number}"
                     
                     # Check if we already found this reference
-                    if not any(item['suggested_name'] == proper_name for item in detected_items):
-                        detected_items.append({
+                    if proper_name not in items_by_name:
+                        item = {
                             "type": ref_type,
                             "page": page_num,
-                            "bbox": None,  # Will be set by user selection
+                            "bbox": None,  # Set from the caption or by user selection
                             "suggested_name": proper_name,
                             "display_name": f"{ref_type.title()} {ref_number}",
                             "text_match": match.group(0)
-                        })
-        
-        doc.close()
+                        }
+                        items_by_name[proper_name] = item
+                        detected_items.append(item)
+                
+                # A block opening with a caption proposes the region of its item:
+                # the graphic above a figure's caption or below a table's
+                caption = _CAPTION_RE.match(text)
+                if caption:
+                    item = items_by_name.get(f"{caption.group(1).lower()}{caption.group(2)}")
+                    if item is not None and item["bbox"] is None:
+                        if graphics is None:
+                            page_area = page.rect.get_area()
+                            graphics = [fitz.Rect(info["bbox"]) for info in page.get_image_info()]
+                            graphics.extend(d["rect"] for d in page.get_drawings())
+                            # Leave out page backgrounds and borders
+                            graphics = [r for r in graphics if r.get_area() < 0.9 * page_area]
+                        
+                        if text_blocks is None:
+                            # Block type 0 is text; images are among the graphics
+                            text_blocks = [(fitz.Rect(b[:4]), b[4]) for b in blocks if b[6] == 0]
+                        region = _propose_region(
+                            fitz.Rect(block[:4]), graphics, above=item["type"] != "table",
+                            text_blocks=text_blocks, page_rect=page.rect,
+                        )
+                        if region is not None:
+                            item["page"] = page_num
+                            item["bbox"] = region
+                            item["auto_detected"] = True
         
         # Sort by type and number for better organization
         def sort_key(item):
             # Extract numeric part for proper sorting
-            import re
-            match = re.search(r'(\d+(?:\.\d+)?)', item['suggested_name'])
+            match = _ITEM_NUMBER_RE.search(item['suggested_name'])
             if match:
                 return (item['type'], float(match.group(1)))
             return (item['type'], 0)
@@ -112,27 +411,100 @@ class PDFImageExtractor:
         root.geometry("1400x900")
         root.configure(bg="white")
         
+        # Items whose region was found from their caption start out selected,
+        # so they only need to be confirmed (or reselected)
         selected_items = []
+        for item in self.detected_items:
+            if item.get("auto_detected"):
+                item.setdefault("final_name", item["suggested_name"])
+                selected_items.append(item)
         current_page = 0
         current_selection = None
         selection_start = None
         selection_rect = None
         
         # Open PDF for preview
-        doc = fitz.open(self.pdf_path)
+        doc = self.doc
         
-        def render_page(page_num):
-            """Render PDF page as image."""
-            page = doc[page_num]
+        # Pages are previewed at up to 2x zoom, drawn as a grid of tiles so that
+        # only the part of the page inside the viewport is ever rasterized. Large
+        # pages get a lower zoom so the preview stays within max_preview_size.
+        max_zoom = 2.0
+        max_preview_size = 2000  # Longer side of the previewed page, in canvas pixels
+        zoom = max_zoom  # Zoom of the page being shown
+        mat = fitz.Matrix(zoom, zoom)
+        tile_size = 1024  # Tile edge in canvas pixels
+        display_list = None  # Display list of the page being shown
+        tile_images = None  # Rendered tiles of the page being shown
+        page_tiles = {}  # (column, row) -> canvas item of the tiles on the canvas
+        
+        # Display lists and rendered tiles of recently shown pages, most recent
+        # last, so going back to a page does not render it again
+        page_cache = OrderedDict()
+        
+        def get_page_entry(page_num):
+            """Return the display list and tile images of a page, recording the page on first use."""
+            if page_num in page_cache:
+                page_cache.move_to_end(page_num)
+                return page_cache[page_num]
+            
+            # Tiles render from the page's display list, which extraction reuses
+            entry = (self.get_displaylist(page_num), {})
+            page_cache[page_num] = entry
+            if len(page_cache) > _PAGE_CACHE_SIZE:
+                page_cache.popitem(last=False)
+            return entry
+        
+        def render_tile(column, row):
+            """Place one tile of the current page on the canvas, rendering it if needed."""
+            key = (column, row)
+            if key not in tile_images:
+                x0, y0 = column * tile_size, row * tile_size
+                clip = fitz.Rect(x0, y0, x0 + tile_size, y0 + tile_size) / zoom & display_list.rect
+                pix = display_list.get_pixmap(matrix=mat, clip=clip, alpha=False)
+                
+                # Build the PIL image from a view of the raw samples, without
+                # encoding them or copying them into a bytes object first
+                mode = "RGBA" if pix.alpha else "RGB"
+                pil_img = Image.frombytes(mode, (pix.width, pix.height), pix.samples_mv)
+                tile_images[key] = (pix.x, pix.y, ImageTk.PhotoImage(pil_img))
+                pix = None
+            
+            x, y, photo = tile_images[key]
+            return canvas.create_image(x, y, anchor=tk.NW, image=photo, tags="tile")
+        
+        def render_tiles(*_):
+            """Render the tiles visible in the viewport and drop the ones scrolled out of it."""
+            if display_list is None:
+                return
+            
+            page_width, page_height = display_list.rect.width * zoom, display_list.rect.height * zoom
+            left, top = canvas.canvasx(0), canvas.canvasy(0)
+            right = min(left + canvas.winfo_width(), page_width - 1)
+            bottom = min(top + canvas.winfo_height(), page_height - 1)
             
-            # Render page as image
-            mat = fitz.Matrix(2.0, 2.0)  # 2x zoom
-            pix = page.get_pixmap(matrix=mat)
-            img_data = pix.tobytes("ppm")
+            visible = {
+                (column, row)
+                for column in range(max(0, int(left // tile_size)), int(right // tile_size) + 1)
+                for row in range(max(0, int(top // tile_size)), int(bottom // tile_size) + 1)
+            }
             
-            # Convert to PIL image
-            pil_img = Image.open(io.BytesIO(img_data))
-            return pil_img
+            for key in [key for key in page_tiles if key not in visible]:
+                canvas.delete(page_tiles.pop(key))
+            for key in visible:
+                if key not in page_tiles:
+                    page_tiles[key] = render_tile(*key)
+            
+            # Keep the selection rectangle and the selected regions above the page
+            canvas.tag_lower("tile")
+        
+        def scroll_x(*args):
+            canvas.xview(*args)
+            render_tiles()
+        
+        def scroll_y(*args):
+            canvas.yview(*args)
+            render_tiles()
         
         # Create UI elements
         frame = tk.Frame(root, bg="white")
@@ -162,8 +534,8 @@ class PDFImageExtractor:
         canvas_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         
         canvas = tk.Canvas(canvas_frame, bg="white", cursor="crosshair")
-        scrollbar_v = tk.Scrollbar(canvas_frame, orient=tk.VERTICAL, command=canvas.yview, bg="white")
-        scrollbar_h = tk.Scrollbar(canvas_frame, orient=tk.HORIZONTAL, command=canvas.xview, bg="white")
+        scrollbar_v = tk.Scrollbar(canvas_frame, orient=tk.VERTICAL, command=scroll_y, bg="white")
+        scrollbar_h = tk.Scrollbar(canvas_frame, orient=tk.HORIZONTAL, command=scroll_x, bg="white")
         canvas.configure(yscrollcommand=scrollbar_v.set, xscrollcommand=scrollbar_h.set)
         
         canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
@@ -199,6 +571,17 @@ class PDFImageExtractor:
             for item in selected_items:
                 selected_listbox.insert(tk.END, f"{item['display_name']} (Page {item['page']+1})")
         
+        def draw_selected_regions():
+            """Outline the regions of the selected items on the current page."""
+            canvas.delete("region")
+            for item in selected_items:
+                if item["page"] == current_page and item.get("bbox") is not None:
+                    x0, y0, x1, y1 = item["bbox"] * zoom
+                    canvas.create_rectangle(x0, y0, x1, y1, outline="green", width=2, tags="region")
+                    canvas.create_text(
+                        x0 + 4, y0 + 4, anchor=tk.NW, text=item["display_name"], fill="green", tags="region"
+                    )
+        
         def get_current_ref():
             """Get the currently selected reference."""
             selection = refs_listbox.curselection()
@@ -220,6 +603,7 @@ class PDFImageExtractor:
                 selected_items.remove(current_ref)
                 update_refs_list()
                 update_selected_list()
+                draw_selected_regions()
                 status_label.config(text=f"Reselecting {current_ref['display_name']} - drag to create rectangle")
             else:
                 status_label.config(text=f"Selecting {current_ref['display_name']} - drag to create rectangle")
@@ -265,17 +649,20 @@ class PDFImageExtractor:
                 # Only proceed if we have a meaningful rectangle
                 if abs(x2 - x1) > 5 and abs(y2 - y1) > 5:
                     # Convert canvas coordinates to PDF coordinates
-                    # Account for 2x zoom factor
-                    pdf_bbox = fitz.Rect(x1/2, y1/2, x2/2, y2/2)
+                    # Account for the zoom factor
+                    pdf_bbox = fitz.Rect(x1, y1, x2, y2) / zoom
                     
                     # Add to selected items
                     current_selection["bbox"] = pdf_bbox
                     current_selection["final_name"] = current_selection["suggested_name"]
                     selected_items.append(current_selection)
                     
-                    # Update displays
+                    # Update displays; the new region is outlined like the others
+                    if selection_rect:
+                        canvas.delete(selection_rect)
                     update_refs_list()
                     update_selected_list()
+                    draw_selected_regions()
                     
                     status_label.config(text="Selection added! Select another item or finish.")
                 else:
@@ -293,28 +680,25 @@ class PDFImageExtractor:
         canvas.bind("<Button-1>", on_canvas_click)
         canvas.bind("<B1-Motion>", on_canvas_drag)
         canvas.bind("<ButtonRelease-1>", on_canvas_release)
+        canvas.bind("<Configure>", render_tiles)
         
         def update_display():
-            nonlocal current_page, selection_rect
+            nonlocal current_page, selection_rect, display_list, tile_images, zoom, mat
             try:
                 new_page = int(page_var.get()) - 1
                 if 0 <= new_page < len(doc):
                     current_page = new_page
-                    img = render_page(current_page)
+                    display_list, tile_images = get_page_entry(current_page)
+                    zoom = min(max_zoom, max_preview_size / max(display_list.rect.width, display_list.rect.height))
+                    mat = fitz.Matrix(zoom, zoom)
                     
-                    # Resize for display
-                    display_img = img.copy()
-                    # Don't thumbnail - keep original size for precise selection
-                    
-                    photo = ImageTk.PhotoImage(display_img)
+                    # Keep original size for precise selection
                     canvas.delete("all")  # This clears all rectangles too
                     selection_rect = None  # Reset the rectangle reference
-                    canvas.create_image(0, 0, anchor=tk.NW, image=photo)
-                    canvas.configure(scrollregion=canvas.bbox("all"))
-                    canvas.image = photo  # Keep a reference
-                    
-                    update_refs_list()
-                    update_selected_list()
+                    page_tiles.clear()
+                    canvas.configure(scrollregion=(0, 0, display_list.rect.width * zoom, display_list.rect.height * zoom))
+                    render_tiles()
+                    draw_selected_regions()
             except ValueError:
                 pass
         
@@ -326,6 +710,7 @@ class PDFImageExtractor:
                 selected_items.remove(item_to_remove)
                 update_refs_list()
                 update_selected_list()
+                draw_selected_regions()
                 status_label.config(text="Item removed from selection")
         
         def finish_selection():
@@ -352,6 +737,10 @@ INSTRUCTIONS:
 3. Click and drag to draw a rectangle around the figure/table
 4. Repeat for all items you want to extract
 5. Click 'Finish Selection' when done
+
+Items found next to their caption are already
+selected and outlined in green; reselect or
+remove them if needed.
 """
         instruction_label = tk.Label(selection_frame, text=instructions, justify=tk.LEFT, 
                                    font=("Arial", 9), fg="gray", bg="white")
@@ -360,13 +749,14 @@ INSTRUCTIONS:
         # Bind events
         page_entry.bind('<Return>', lambda e: update_display())
         
-        # Initial display
+        # Initial display; the lists are only refreshed again when the selection changes
+        update_refs_list()
+        update_selected_list()
         update_display()
         
         # Run the GUI
         root.mainloop()
         root.destroy()
-        doc.close()
         
         self.selected_items = selected_items
         return selected_items
@@ -376,12 +766,34 @@ INSTRUCTIONS:
         if not self.selected_items:
             return {}
         
-        doc = fitz.open(self.pdf_path)
         filename_map = {}
         
+        # Group the items by page, so each page is loaded once however many
+        # items are selected on it
+        items_by_page = defaultdict(list)
         for item in self.selected_items:
+            items_by_page[item["page"]].append(item)
+        
+        # Pages are rendered one after the other: PyMuPDF does not support
+        # using a document (or MuPDF itself) from several threads
+        for page_num, items in items_by_page.items():
+            filename_map.update(self._render_page_items(page_num, items))
+            
+            # Let MuPDF free the cached resources of the page just rendered
+            fitz.TOOLS.store_shrink(100)
+        
+        return filename_map
+    
+    def _render_page_items(self, page_num: int, items: List[Dict]) -> Dict[str, str]:
+        """Save the selected items of one page as PNG images and return their filename mappings."""
+        page = self.doc[page_num]
+        displaylist = self.get_displaylist(page_num)
+        page_area = page.rect.get_area()
+        graphic_rects = None  # Drawings and images on the page, collected on first need
+        filename_map = {}
+        
+        for item in items:
             try:
-                page = doc[item["page"]]
                 bbox = item["bbox"]
                 final_name = item.get("final_name", item["suggested_name"])
                 
@@ -389,16 +801,36 @@ INSTRUCTIONS:
                     print(f"Warning: No bbox for {final_name}, skipping")
                     continue
                 
-                # Render the selected region as high-resolution image
-                mat = fitz.Matrix(3.0, 3.0)  # High resolution for all types
-                pix = page.get_pixmap(matrix=mat, clip=bbox)
-                img_bytes = pix.tobytes("png")
-                filename = f"{final_name}.png"
+                bbox = fitz.Rect(bbox)
+                
+                # Skip selections with nothing to render, checking text first
+                # since it is the cheapest
+                if not page.get_text("text", clip=bbox).strip():
+                    if graphic_rects is None:
+                        graphic_rects = [d["rect"] for d in page.get_drawings()]
+                        graphic_rects.extend(fitz.Rect(info["bbox"]) for info in page.get_image_info())
+                    # Compared coordinate-wise, as Rect.intersects is False for
+                    # the zero-height or zero-width rects of straight strokes
+                    if not any(
+                        r.x0 <= bbox.x1 and r.x1 >= bbox.x0 and r.y0 <= bbox.y1 and r.y1 >= bbox.y0
+                        for r in graphic_rects
+                    ):
+                        print(f"Warning: Nothing to extract in the region of {final_name}, skipping")
+                        continue
+                
+                # Small regions are rendered at high resolution so they stay crisp;
+                # large ones are already big enough at a lower zoom
+                zoom = 3.0 if bbox.get_area() < 0.25 * page_area else 2.0
+                mat = fitz.Matrix(zoom, zoom)
                 
-                # Save image
+                filename = f"{final_name}.png"
                 filepath = os.path.join(self.images_dir, filename)
-                with open(filepath, "wb") as f:
-                    f.write(img_bytes)
+                
+                # Render the selected region as an image and write the PNG
+                # straight to disk, without a copy in Python
+                pix = displaylist.get_pixmap(matrix=mat, clip=bbox)
+                pix.save(filepath)
+                pix = None
                 
                 filename_map[final_name] = f"./images/{filename}"
                 
@@ -406,7 +838,6 @@ INSTRUCTIONS:
                 print(f"Error extracting {item}: {e}")
                 continue
         
-        doc.close()
         return filename_map
 
 
@@ -459,83 +890,104 @@ class EnhancedPdfConverter(DocumentConverter):
         output_dir = Path(output_dir)
         output_dir.mkdir(parents=True, exist_ok=True)
         
-        # Save PDF to temporary file for processing
-        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as temp_pdf:
-            temp_pdf.write(file_stream.read())
-            temp_pdf_path = temp_pdf.name
+        # Read the PDF once; the image extractor works from these bytes in memory,
+        # so no temporary copy is written to disk
+        pdf_bytes = file_stream.read()
         
+        # Initialize image extractor
+        extractor = PDFImageExtractor(pdf_bytes, str(output_dir))
         try:
-            # Extract basic text
-            file_stream.seek(0)
-            basic_text = pdfminer.high_level.extract_text(file_stream)
-            
-            # Initialize image extractor
-            extractor = PDFImageExtractor(temp_pdf_path, str(output_dir))
-            
-            # Detect figures and tables
-            detected_items = extractor.detect_figures_and_tables()
-            
-            # Show interactive selection if items were detected
-            selected_items = []
-            if detected_items:
-                try:
-                    selected_items = extractor.show_interactive_selection()
-                except Exception as e:
-                    print(f"Interactive selection failed: {e}")
-                    # Fall back to auto-selection of all items
-                    selected_items = detected_items
-                    for item in selected_items:
-                        item["final_name"] = item["suggested_name"]
-            
-            # Extract selected images
-            filename_map = {}
-            if selected_items:
-                extractor.selected_items = selected_items
-                filename_map = extractor.extract_selected_items()
-            
-            # Process the text and insert image references
-            processed_text = self._process_text_with_images(basic_text, filename_map, selected_items)
-            
-            # Separate references section
-            main_text, references_text = self._separate_references(processed_text)
-            
-            # Save references to separate file if found
-            if references_text:
-                # Get the base filename from stream_info
-                base_name = "document"
-                if stream_info.filename:
-                    base_name = Path(stream_info.filename).stem
-                elif stream_info.local_path:
-                    base_name = Path(stream_info.local_path).stem
-                
-                references_file = output_dir / f"{base_name}-references-converted.md"
-                with open(references_file, "w", encoding="utf-8") as f:
-                    f.write(references_text)
-                
-                print(f"DEBUG: Created references file: {references_file}")
+            # Extract basic text from the document the extractor already parsed,
+            # page by page, instead of parsing the PDF a second time
+            try:
+                basic_text = "".join(extractor.iter_text())
+            except Exception:
+                # Without a readable document there is nothing to detect or
+                # extract, so convert the text alone if pdfminer can read it
+                logger.debug("PyMuPDF could not read the PDF, falling back to pdfminer", exc_info=True)
+                basic_text = self._extract_text_with_pdfminer(pdf_bytes)
+                if basic_text is None:
+                    raise
+                selected_items, filename_map = [], {}
             else:
-                print("DEBUG: No references text found, skipping references file creation")
+                selected_items, filename_map = self._select_and_extract(extractor)
+        finally:
+            extractor.close()
+        
+        # Process the text and insert image references
+        processed_text = self._process_text_with_images(basic_text, filename_map, selected_items)
+        
+        # Separate references section
+        main_text, references_text = self._separate_references(processed_text)
+        
+        # Save references to separate file if found
+        if references_text:
+            # Get the base filename from stream_info
+            base_name = "document"
+            if stream_info.filename:
+                base_name = Path(stream_info.filename).stem
+            elif stream_info.local_path:
+                base_name = Path(stream_info.local_path).stem
             
-            return DocumentConverterResult(
-                markdown=main_text,
-                title=self._extract_title(basic_text)
-            )
+            references_file = output_dir / f"{base_name}-references-converted.md"
+            with open(references_file, "w", encoding="utf-8") as f:
+                f.write(references_text)
             
-        finally:
-            # Clean up temporary PDF
+            logger.debug("Created references file: %s", references_file)
+        else:
+            logger.debug("No references text found, skipping references file creation")
+        
+        return DocumentConverterResult(
+            markdown=main_text,
+            title=self._extract_title(basic_text)
+        )
+    
+    def _select_and_extract(self, extractor: PDFImageExtractor) -> Tuple[List[Dict], Dict[str, str]]:
+        """Detect the figures and tables, let the user select them, and extract the selection.
+        
+        Returns the selected items and the map of their names to image paths.
+        """
+        # Detect figures and tables
+        detected_items = extractor.detect_figures_and_tables()
+        
+        # Show interactive selection if items were detected
+        selected_items = []
+        if detected_items:
             try:
-                os.unlink(temp_pdf_path)
-            except:
-                pass
+                selected_items = extractor.show_interactive_selection()
+            except Exception as e:
+                print(f"Interactive selection failed: {e}")
+                # Fall back to auto-selection of all items
+                selected_items = detected_items
+                for item in selected_items:
+                    item["final_name"] = item["suggested_name"]
+        
+        # Extract selected images
+        filename_map = {}
+        if selected_items:
+            extractor.selected_items = selected_items
+            filename_map = extractor.extract_selected_items()
+        
+        return selected_items, filename_map
+    
+    def _extract_text_with_pdfminer(self, pdf_bytes: bytes) -> Optional[str]:
+        """Extract the text with pdfminer, for PDFs that PyMuPDF cannot read.
+        
+        Returns None if pdfminer is not installed.
+        """
+        # Imported here since it is only needed on this fallback path
+        try:
+            import pdfminer.high_level
+        except ImportError:
+            return None
+        
+        return pdfminer.high_level.extract_text(io.BytesIO(pdf_bytes))
     
     def _process_text_with_images(self, text: str, filename_map: Dict[str, str], selected_items: List[Dict]) -> str:
         """Insert image references into the text at appropriate locations."""
         if not filename_map or not selected_items:
             return text
         
-        lines = text.split('\n')
-        processed_lines = []
-        
         # Create a mapping from selected items to their display names for better matching
         selected_items_map = {}
         for item in selected_items:
@@ -543,60 +995,94 @@ class EnhancedPdfConverter(DocumentConverter):
             display_name = item.get('display_name', '')
             if final_name and display_name:
                 selected_items_map[final_name] = display_name
+        extracted_names = [name for name in filename_map if name in selected_items_map]
+        
+        logger.debug("Selected items map: %s", selected_items_map)
+        logger.debug("Filename map: %s", filename_map)
+        
+        if len(extracted_names) == 1:
+            # Fast path for a single image: find its first mention with literal
+            # searches of the lower-cased text rather than building a pattern
+            item_name = extracted_names[0]
+            display_name = selected_items_map[item_name]
+            lowered = text.lower()
+            # Lower-casing can change the length of non-ASCII text, which would
+            # shift positions; such text goes through the general path
+            if len(lowered) == len(text):
+                mentions = [
+                    mention for mention in (
+                        _find_whole_word(lowered, variant.lower())
+                        for variant in (display_name, item_name)
+                    )
+                    if mention[0] != -1
+                ]
+                if not mentions:
+                    return text
+                
+                line_end = text.find('\n', min(mentions)[1])
+                if line_end == -1:
+                    line_end = len(text)
+                logger.debug("Inserted image reference for %s", display_name)
+                return f"{text[:line_end]}\n\n![{display_name}]({filename_map[item_name]})\n{text[line_end:]}"
+        
+        # Map every way an item may be written (e.g., "Figure 1", "figure1") to the item
+        item_by_variant = {}
+        for item_name in extracted_names:
+            for variant in (selected_items_map[item_name], item_name):
+                item_by_variant.setdefault(variant.lower(), item_name)
         
-        print(f"DEBUG: Selected items map: {selected_items_map}")
-        print(f"DEBUG: Filename map: {filename_map}")
+        if not item_by_variant:
+            return text
+        
+        # One alternation over all variants, so each line is scanned once no matter
+        # how many items there are. Longer variants go first so that "Figure 1.1"
+        # is not reported as "Figure 1".
+        variants = tuple(sorted(item_by_variant, key=lambda v: (-len(v), v)))
+        reference_pattern = _compile_reference_pattern(variants)
+        item_by_group = {f"g{i}": item_by_variant[v] for i, v in enumerate(variants)}
         
-        for line in lines:
-            processed_lines.append(line)
+        # A single scan over the whole text. Each image goes after the line with
+        # the first mention of its item, once per document.
+        pieces = []
+        copied_to = 0  # text[:copied_to] is already in pieces
+        inserted = set()
+        for match in reference_pattern.finditer(text):
+            item_name = item_by_group[match.lastgroup]
+            if item_name in inserted:
+                continue
+            inserted.add(item_name)
             
-            # Look for figure/table references in the text
-            for item_name, image_path in filename_map.items():
-                if item_name in selected_items_map:
-                    display_name = selected_items_map[item_name]
-                    
-                    # Create patterns to match both the display name and variations
-                    patterns = [
-                        rf'\b{re.escape(display_name)}\b',  # e.g., "Figure 1"
-                        rf'\b{re.escape(display_name.lower())}\b',  # e.g., "figure 1"
-                        rf'\b{re.escape(item_name)}\b',  # e.g., "figure1"
-                    ]
-                    
-                    for pattern in patterns:
-                        if re.search(pattern, line, re.IGNORECASE):
-                            # Insert image reference after this line
-                            alt_text = display_name
-                            image_ref = f"\n![{alt_text}]({image_path})\n"
-                            processed_lines.append(image_ref)
-                            print(f"DEBUG: Inserted image reference for {display_name}")
-                            break
-        
-        return '\n'.join(processed_lines)
+            line_end = text.find('\n', match.end())
+            if line_end == -1:
+                line_end = len(text)
+            if line_end > copied_to:
+                pieces.append(text[copied_to:line_end])
+                copied_to = line_end
+            
+            display_name = selected_items_map[item_name]
+            pieces.append(f"\n\n![{display_name}]({filename_map[item_name]})\n")
+            logger.debug("Inserted image reference for %s", display_name)
+        
+        pieces.append(text[copied_to:])
+        return ''.join(pieces)
     
     def _separate_references(self, text: str) -> Tuple[str, str]:
         """Separate the references section from the main text."""
-        # Look for common reference section markers
-        ref_patterns = [
-            r'\n\s*REFERENCES\s*\n',
-            r'\n\s*References\s*\n',
-            r'\n\s*BIBLIOGRAPHY\s*\n',
-            r'\n\s*Bibliography\s*\n',
-        ]
-        
-        print(f"DEBUG: Searching for references section in text of length {len(text)}")
-        
-        for pattern in ref_patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
+        logger.debug("Searching for references section in text of length %d", len(text))
+        
+        # Stop at the first (most dependable) marker that matches
+        for pattern in _REFERENCE_SECTION_PATTERNS:
+            match = pattern.search(text)
             if match:
                 split_pos = match.start()
                 main_text = text[:split_pos].strip()
                 references_text = text[split_pos:].strip()
-                print(f"DEBUG: Found references section with pattern: {pattern}")
-                print(f"DEBUG: References section length: {len(references_text)}")
+                logger.debug("Found references section with pattern: %s", pattern.pattern)
+                logger.debug("References section length: %d", len(references_text))
                 return main_text, references_text
         
         # No references section found
-        print("DEBUG: No references section found")
+        logger.debug("No references section found")
         return text, ""
     
     def _extract_title(self, text: str) -> Optional[str]:
@@ -606,6 +1092,6 @@ class EnhancedPdfConverter(DocumentConverter):
             line = line.strip()
             if line and len(line) < 200:  # Reasonable title length
                 # Skip if it looks like metadata
-                if not any(marker in line.lower() for marker in ['doi:', 'arxiv:', 'volume', 'page']):
+                if _METADATA_MARKER_RE.search(line) is None:
                     return line
         return None
\ No newline at end of file
@@ -0,0 +1,359 @@
+#!/usr/bin/env python3 -m pytest
+import io
+import random
+import sys
+import pytest
+
+from markitdown import StreamInfo
+from markitdown.converters import EnhancedPdfConverter
+
+# This file contains tests of the enhanced PDF converter that do not need the
+# interactive selection window (e.g., the regions proposed from captions, or
+# the placement of image references in the Markdown).
+
+# Skip these tests if PyMuPDF (or tkinter, which the converter imports) is missing
+skip_enhanced = False
+try:
+    import fitz
+    from PIL import Image
+    from markitdown.converters._pdf_enhanced_converter import PDFImageExtractor
+except ImportError:
+    skip_enhanced = True
+
+
+def _build_captioned_pdf() -> bytes:
+    """A page with a captioned figure (caption below it) and a ruled table (caption above it)."""
+    doc = fitz.open()
+    page = doc.new_page()
+
+    page.insert_text((60, 60), "As Figure 1 and Table 3 show, results improve.", fontsize=10)
+
+    # Figure 1: an image, captioned below
+    image = Image.new("RGB", (200, 100), (200, 30, 30))
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    page.insert_image(fitz.Rect(60, 100, 260, 200), stream=buffer.getvalue())
+    page.insert_text((60, 220), "Figure 1: A red box.", fontsize=10)
+
+    # Table 3: top, middle and bottom rules with rows of text between them
+    page.insert_text((60, 320), "Table 3. Results of the experiment", fontsize=10)
+    page.draw_line((60, 340), (300, 340))
+    page.insert_text((65, 360), "Method   Score", fontsize=10)
+    page.draw_line((60, 368), (300, 368))
+    page.insert_text((65, 385), "Ours     0.91", fontsize=10)
+    page.draw_line((60, 400), (300, 400))
+    page.insert_text((60, 440), "Body text after the table continues here.", fontsize=10)
+
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+@pytest.mark.skipif(
+    skip_enhanced,
+    reason="do not run if the enhanced PDF converter's dependencies are not installed",
+)
+def test_caption_regions(tmp_path) -> None:
+    extractor = PDFImageExtractor(_build_captioned_pdf(), str(tmp_path))
+    try:
+        items = {item["suggested_name"]: item for item in extractor.detect_figures_and_tables()}
+    finally:
+        extractor.close()
+
+    # The figure is the image above its caption
+    figure = items["figure1"]
+    assert figure["auto_detected"]
+    assert figure["bbox"] == fitz.Rect(60, 100, 260, 200)
+
+    # The table spans all three rules and the rows between them, but not the
+    # body text that follows
+    table = items["table3"]
+    assert table["auto_detected"]
+    assert table["bbox"].y0 == pytest.approx(340)
+    assert table["bbox"].y1 == pytest.approx(400)
+    assert table["bbox"].x0 == pytest.approx(60)
+    assert table["bbox"].x1 == pytest.approx(300)
+
+
+def _detect_single_item(tmp_path, draw) -> dict:
+    """Detect the items of a one-page PDF drawn by draw(page), which must yield exactly one."""
+    doc = fitz.open()
+    draw(doc.new_page())
+    data = doc.tobytes()
+    doc.close()
+
+    extractor = PDFImageExtractor(data, str(tmp_path))
+    try:
+        (item,) = extractor.detect_figures_and_tables()
+    finally:
+        extractor.close()
+    return item
+
+
+@pytest.mark.skipif(
+    skip_enhanced,
+    reason="do not run if the enhanced PDF converter's dependencies are not installed",
+)
+def test_vector_chart_region(tmp_path) -> None:
+    def draw(page):
+        page.insert_text((60, 60), "The training curve below shows how accuracy improves over time.", fontsize=10)
+        page.draw_line((100, 100), (100, 250))  # y axis
+        page.draw_line((100, 250), (350, 250))  # x axis
+        for x in range(120, 351, 40):
+            page.draw_line((x, 250), (x, 255))  # ticks
+        page.draw_polyline([(100, 240), (150, 200), (200, 180), (250, 140), (300, 130), (350, 110)])
+        page.insert_text((200, 270), "Epoch", fontsize=9)
+        page.insert_text((70, 175), "Acc", fontsize=9)
+        page.insert_text((150, 300), "Figure 2: Accuracy.", fontsize=10)
+
+    # The axes, ticks and curve are taken together with the axis labels,
+    # but not the body text above
+    figure = _detect_single_item(tmp_path, draw)
+    assert figure["auto_detected"]
+    assert figure["bbox"].x0 == pytest.approx(70)  # The "Acc" label
+    assert figure["bbox"].x1 == pytest.approx(350)
+    assert 62 < figure["bbox"].y0 <= 100
+    assert 255 < figure["bbox"].y1 < 290  # The "Epoch" label, not the caption
+
+
+@pytest.mark.skipif(
+    skip_enhanced,
+    reason="do not run if the enhanced PDF converter's dependencies are not installed",
+)
+def test_scatter_plot_region(tmp_path) -> None:
+    def draw(page):
+        page.insert_text((60, 60), "The sparse results below are from four separate experiment runs.", fontsize=10)
+        for x, y in [(120, 150), (200, 110), (260, 190), (320, 130)]:
+            page.draw_circle((x, y), 2, fill=(0, 0, 0))
+        page.insert_text((100, 230), "Figure 3: Scatter.", fontsize=10)
+
+    # Markers that do not touch each other still make up one region, including
+    # those beyond the caption's width
+    figure = _detect_single_item(tmp_path, draw)
+    assert figure["auto_detected"]
+    assert figure["bbox"] == fitz.Rect(118, 108, 322, 192)
+
+
+@pytest.mark.skipif(
+    skip_enhanced,
+    reason="do not run if the enhanced PDF converter's dependencies are not installed",
+)
+def test_lone_rule_is_not_a_region(tmp_path) -> None:
+    def draw(page):
+        page.insert_text((60, 320), "Table 3. Results", fontsize=10)
+        page.draw_line((60, 340), (300, 340))
+
+    # A caption above a single ruling line has nothing to extract
+    table = _detect_single_item(tmp_path, draw)
+    assert table["bbox"] is None
+    assert not table.get("auto_detected")
+
+
+@pytest.mark.skipif(
+    skip_enhanced,
+    reason="do not run if the enhanced PDF converter's dependencies are not installed",
+)
+def test_text_blocks_are_paragraphs(tmp_path) -> None:
+    extractor = PDFImageExtractor(_build_captioned_pdf(), str(tmp_path))
+    try:
+        text = "".join(extractor.iter_text())
+    finally:
+        extractor.close()
+
+    # Separate text blocks stay separate Markdown paragraphs
+    assert "results improve.\n\nFigure 1: A red box.\n\nTable 3. Results" in text
+    # Image blocks contribute no text
+    assert "<image" not in text
+
+
+@pytest.mark.skipif(
+    skip_enhanced,
+    reason="do not run if the enhanced PDF converter's dependencies are not installed",
+)
+def test_extract_line_art_and_skip_empty_regions(tmp_path) -> None:
+    # Horizontal and vertical strokes only, with no text
+    doc = fitz.open()
+    page = doc.new_page()
+    page.draw_line((60, 100), (300, 100))
+    page.draw_line((60, 160), (300, 160))
+    page.draw_line((180, 100), (180, 160))
+    data = doc.tobytes()
+    doc.close()
+
+    extractor = PDFImageExtractor(data, str(tmp_path))
+    extractor.selected_items = [
+        {"page": 0, "bbox": fitz.Rect(50, 90, 310, 170), "suggested_name": "figure1", "final_name": "figure1"},
+        {"page": 0, "bbox": fitz.Rect(50, 400, 310, 500), "suggested_name": "figure2", "final_name": "figure2"},
+    ]
+    try:
+        filename_map = extractor.extract_selected_items()
+    finally:
+        extractor.close()
+
+    # The region holding the strokes is extracted, the blank one is skipped
+    assert filename_map == {"figure1": "./images/figure1.png"}
+    assert (tmp_path / "images" / "figure1.png").is_file()
+
+
+def _unreadable_by_pymupdf(monkeypatch) -> None:
+    """Make PyMuPDF fail to open any PDF, and fail the test if detection is attempted."""
+
+    def fail_to_open(self):
+        raise RuntimeError("cannot open broken document")
+
+    def fail_to_detect(self):
+        raise AssertionError("detection ran on a document PyMuPDF could not open")
+
+    monkeypatch.setattr(PDFImageExtractor, "_open_document", fail_to_open)
+    monkeypatch.setattr(PDFImageExtractor, "detect_figures_and_tables", fail_to_detect)
+
+
+@pytest.mark.skipif(
+    skip_enhanced,
+    reason="do not run if the enhanced PDF converter's dependencies are not installed",
+)
+def test_pdfminer_fallback(tmp_path, monkeypatch) -> None:
+    pytest.importorskip("pdfminer.high_level")
+    _unreadable_by_pymupdf(monkeypatch)
+
+    # Called directly, as MarkItDown would retry with its own PDF converter
+    result = EnhancedPdfConverter().convert(
+        io.BytesIO(_build_captioned_pdf()), StreamInfo(extension=".pdf"), output_dir=str(tmp_path)
+    )
+
+    # The text comes from pdfminer, with no images extracted
+    assert "Results of the experiment" in result.markdown
+    assert "![" not in result.markdown
+    assert not any((tmp_path / "images").iterdir())
+
+
+@pytest.mark.skipif(
+    skip_enhanced,
+    reason="do not run if the enhanced PDF converter's dependencies are not installed",
+)
+def test_pdfminer_fallback_missing(tmp_path, monkeypatch) -> None:
+    _unreadable_by_pymupdf(monkeypatch)
+    # A None entry makes importing pdfminer.high_level raise ImportError
+    monkeypatch.setitem(sys.modules, "pdfminer.high_level", None)
+
+    # The PyMuPDF error is reported, not the missing fallback
+    with pytest.raises(RuntimeError, match="cannot open broken document"):
+        EnhancedPdfConverter().convert(
+            io.BytesIO(_build_captioned_pdf()), StreamInfo(extension=".pdf"), output_dir=str(tmp_path)
+        )
+
+
+
+def _selected(*names: str) -> list:
+    """Selected items for names such as "figure1.1", as the selection window leaves them."""
+    items = []
+    for name in names:
+        kind, number = name.rstrip("0123456789."), name.lstrip("abcdefghijklmnopqrstuvwxyz")
+        items.append(
+            {
+                "type": kind,
+                "suggested_name": name,
+                "final_name": name,
+                "display_name": f"{kind.title()} {number}",
+            }
+        )
+    return items
+
+
+def _process(text: str, *names: str) -> str:
+    """Insert the images of the named items into text."""
+    filename_map = {name: f"./images/{name}.png" for name in names}
+    return EnhancedPdfConverter()._process_text_with_images(text, filename_map, _selected(*names))
+
+
+def test_image_after_first_mention() -> None:
+    text = "Intro\nAs Figure 1 shows, it works.\nFigure 1 again.\nEnd"
+
+    # The image goes after the line of the first mention, and only there
+    assert _process(text, "figure1") == (
+        "Intro\nAs Figure 1 shows, it works.\n\n![Figure 1](./images/figure1.png)\n\nFigure 1 again.\nEnd"
+    )
+
+
+def test_image_once_per_document() -> None:
+    text = "see figure 1\nand FIGURE 1\nand figure1 shorthand\nTable 2 here"
+    processed = _process(text, "figure1", "table2")
+
+    assert processed.count("![Figure 1]") == 1
+    assert processed.count("![Table 2]") == 1
+    assert processed.index("![Figure 1]") < processed.index("and FIGURE 1")
+
+
+def test_longer_variant_wins() -> None:
+    # "Figure 1.1" is its own item, not a mention of "Figure 1"
+    text = "Figure 1.1 is nested\nFigure 10 is not ours\nsee Figure 1\n"
+    processed = _process(text, "figure1", "figure1.1")
+
+    assert processed == (
+        "Figure 1.1 is nested\n\n![Figure 1.1](./images/figure1.1.png)\n\n"
+        "Figure 10 is not ours\nsee Figure 1\n\n![Figure 1](./images/figure1.png)\n\n"
+    )
+
+
+def test_unmentioned_or_unselected_items() -> None:
+    text = "Figure 10 is not Figure 1's neighbour"
+
+    # Whole words only: "Figure 10" is not a mention of figure1, but the
+    # possessive is
+    assert _process("Figure 10 only", "figure1") == "Figure 10 only"
+    assert "![Figure 1]" in _process(text, "figure1")
+
+    # Images whose item was not selected are not inserted
+    converter = EnhancedPdfConverter()
+    assert converter._process_text_with_images(text, {"figure1": "./images/figure1.png"}, []) == text
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "see figure 1 and Table 1 here\nFigure 1 again",
+        "no mention at all",
+        "ends with Figure 1",
+        "Figure 10 and figure 1.1, then figure1",
+        "Figure 10 first\nthen figure 1",
+        "FIGURE 1\n\nparagraph",
+        "x_figure1 figure1_y\n(figure1)",
+        "",
+    ],
+)
+def test_single_image_path_matches_general_path(text) -> None:
+    # With a second item that is never mentioned, a single image goes through
+    # the general path, which has to place it exactly as the single-image path
+    assert _process(text, "figure1") == _process(text, "figure1", "table999")
+
+
+def test_single_image_path_matches_general_path_fuzzed() -> None:
+    # Random texts made of mentions, near misses and separators
+    tokens = ["Figure 1", "figure1", "FIGURE 1", "Figure 10", "Figure 1.1", "figure 11",
+              "_figure1", "figure1x", "Table 1", "word", " ", "\n", ".", "(", "'s", "é", "İ"]
+    rng = random.Random(0)
+    for _ in range(500):
+        text = "".join(rng.choice(tokens) for _ in range(rng.randrange(12)))
+        assert _process(text, "figure1") == _process(text, "figure1", "table999"), repr(text)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "Body.\n\nREFERENCES\n[1] A paper.",
+        "Body.\n\n\x0cREFERENCES\n[1] A paper.",  # At the top of a pdfminer page
+        "Body.\r\n\r\nReferences\r\n[1] A paper.",
+        "Body.\n  Bibliography \n[1] A paper.",
+    ],
+)
+def test_separate_references(text) -> None:
+    main_text, references_text = EnhancedPdfConverter()._separate_references(text)
+
+    assert main_text == "Body."
+    assert references_text.lower().startswith(("references", "bibliography"))
+    assert references_text.endswith("[1] A paper.")
+
+
+def test_references_heading_must_be_alone_on_its_line() -> None:
+    text = "See the references below.\nNo heading here."
+    assert EnhancedPdfConverter()._separate_references(text) == (text, "")
@@ -3,23 +3,107 @@
 Setup script for Enhanced PDF Converter dependencies
 
 This script helps install all required dependencies for the enhanced PDF converter.
+
+Packages are installed with uv when it is on the PATH, since it is much faster
+than pip (install it with: pip install uv). Otherwise pip is used. Run with
+--verbose to see the installers' output as they run.
 """
 
+import argparse
+import hashlib
+import importlib.util
+import json
+import shutil
 import subprocess
 import sys
-import os
+from collections import deque
+from pathlib import Path
+
+# Fingerprint of the environment after the last successful setup
+SETUP_CACHE_FILE = Path(".setup_cache.json")
 
-def run_command(command, description):
-    """Run a command and handle errors."""
+# Source checkout of markitdown with the enhanced PDF converter
+MARKITDOWN_SRC = Path("./markitdown-image-seperator/packages/markitdown")
+
+def run_command(command, description, verbose=False):
+    """Run a command and handle errors.
+    
+    The command's output is streamed, and echoed if verbose is set. Only its
+    last lines are kept, to report if the command fails.
+    """
     print(f"🔄 {description}...")
+    output_tail = deque(maxlen=50)
     try:
-        result = subprocess.run(command, shell=True, check=True, capture_output=True, text=True)
-        print(f"✅ {description} completed successfully")
-        return True
-    except subprocess.CalledProcessError as e:
+        # The command is an argument list run without a shell, so paths with
+        # spaces or brackets need no quoting
+        with subprocess.Popen(
+            command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1
+        ) as process:
+            for line in process.stdout:
+                if verbose:
+                    print(line, end="")
+                output_tail.append(line)
+    except OSError as e:
+        # Without a shell, a missing program is reported here rather than as a
+        # failed command
         print(f"❌ {description} failed:")
-        print(f"   Error: {e.stderr}")
+        print(f"   Error: {e}")
         return False
+    
+    if process.returncode != 0:
+        print(f"❌ {description} failed:")
+        print(f"   Error: {''.join(output_tail)}")
+        return False
+    
+    print(f"✅ {description} completed successfully")
+    return True
+
+def install_command(*args):
+    """Build the argument list that installs the given pip arguments into this Python."""
+    uv = shutil.which("uv")
+    if uv:
+        # uv is a drop-in for pip install; point it at the running interpreter
+        return [uv, "pip", "install", "--python", sys.executable, *args]
+    
+    # Wheels are preferred over newer source releases, which would have to be
+    # compiled (PyMuPDF)
+    return [sys.executable, "-m", "pip", "install", "--prefer-binary", *args]
+
+def environment_fingerprint():
+    """Hash of the installed packages, the Python version, this script and markitdown's pyproject.toml.
+    
+    Returns None if the installed packages cannot be listed.
+    """
+    # Listed by the same installer that install_command uses; environments
+    # created by uv often have no pip
+    uv = shutil.which("uv")
+    if uv:
+        command = [uv, "pip", "freeze", "--python", sys.executable]
+    else:
+        command = [sys.executable, "-m", "pip", "freeze"]
+    
+    try:
+        freeze = subprocess.run(command, check=True, capture_output=True).stdout
+    except (subprocess.CalledProcessError, OSError):
+        return None
+    
+    digest = hashlib.sha256(freeze)
+    digest.update(sys.version.encode())
+    digest.update(Path(__file__).read_bytes())
+    
+    # A change to the pdf-enhanced extra has to trigger a reinstall
+    try:
+        digest.update((MARKITDOWN_SRC / "pyproject.toml").read_bytes())
+    except OSError:
+        pass
+    return digest.hexdigest()
+
+def load_cached_fingerprint():
+    """Fingerprint saved by the last successful setup, or None."""
+    try:
+        return json.loads(SETUP_CACHE_FILE.read_text(encoding="utf-8")).get("fingerprint")
+    except (OSError, ValueError):
+        return None
 
 def check_python_version():
     """Check if Python version is compatible."""
@@ -34,7 +118,7 @@ def check_python_version():
     print(f"✅ Python {version.major}.{version.minor}.{version.micro} is compatible")
     return True
 
-def install_dependencies():
+def install_dependencies(verbose=False):
     """Install all required dependencies."""
     print("\n📦 Installing Dependencies")
     print("-" * 30)
@@ -46,27 +130,27 @@ def install_dependencies():
         "pillow",
     ]
     
-    for dep in dependencies:
-        if not run_command(f"pip install {dep}", f"Installing {dep}"):
-            return False
-    
-    return True
+    # One installer run for all of them, so they are resolved together and the
+    # connections are reused instead of starting over for each package
+    return run_command(
+        install_command(*dependencies),
+        f"Installing {', '.join(dependencies)}",
+        verbose=verbose,
+    )
 
-def install_markitdown():
+def install_markitdown(verbose=False):
     """Install markitdown with enhanced PDF support."""
     print("\n📚 Installing Enhanced MarkItDown")
     print("-" * 30)
     
-    markitdown_path = "./markitdown-image-seperator/packages/markitdown"
-    
-    if not os.path.exists(markitdown_path):
-        print(f"❌ MarkItDown source not found at: {markitdown_path}")
+    if not MARKITDOWN_SRC.is_dir():
+        print(f"❌ MarkItDown source not found at: {MARKITDOWN_SRC}")
         print("   Please ensure the markitdown-image-seperator directory exists")
         return False
     
     # Install in development mode with enhanced PDF support
-    command = f"pip install -e '{markitdown_path}[pdf-enhanced]'"
-    return run_command(command, "Installing enhanced MarkItDown")
+    command = install_command("-e", f"{MARKITDOWN_SRC}[pdf-enhanced]")
+    return run_command(command, "Installing enhanced MarkItDown", verbose=verbose)
 
 def verify_installation():
     """Verify that all components are properly installed."""
@@ -84,16 +168,23 @@ def verify_installation():
     all_good = True
     
     for display_name, import_name in test_imports:
-        try:
-            __import__(import_name)
+        # Only located here; the converter import below is what actually loads them
+        if importlib.util.find_spec(import_name) is not None:
             print(f"✅ {display_name}")
-        except ImportError as e:
-            print(f"❌ {display_name} - {e}")
+        else:
+            print(f"❌ {display_name} - No module named '{import_name}'")
             all_good = False
     
-    # Test enhanced converter import
+    # With a dependency missing the converter cannot load, so fail fast instead
+    # of paying for importing MarkItDown and the dependencies that are there
+    if not all_good:
+        print("❌ Enhanced PDF Converter - skipped, dependencies are missing")
+        return False
+    
+    # Test enhanced converter import (a real import, since it checks that the
+    # converter and its dependencies load together)
     try:
-        sys.path.insert(0, "./markitdown-image-seperator/packages/markitdown/src")
+        sys.path.insert(0, str(MARKITDOWN_SRC / "src"))
         from markitdown.converters import EnhancedPdfConverter
         print("✅ Enhanced PDF Converter")
     except ImportError as e:
@@ -116,7 +207,7 @@ def setup_test_environment():
     ]
     
     for directory in test_dirs:
-        os.makedirs(directory, exist_ok=True)
+        Path(directory).mkdir(parents=True, exist_ok=True)
         print(f"✅ Created directory: {directory}")
     
     # Create a simple test PDF info file
@@ -139,7 +230,7 @@ python example_usage.py
 python test_enhanced_converter.py
 
 # Install additional dependencies if needed
-pip install pdfminer.six pymupdf pillow
+pip install --prefer-binary pdfminer.six pymupdf pillow
 ```
 
 ## Output Structure:
@@ -148,13 +239,18 @@ pip install pdfminer.six pymupdf pillow
 - images/ folder with extracted figures and tables
 """
     
-    with open("TEST_SETUP.md", "w") as f:
-        f.write(test_info)
+    Path("TEST_SETUP.md").write_text(test_info, encoding="utf-8")
     
     print("✅ Created TEST_SETUP.md with instructions")
 
 def main():
     """Main setup function."""
+    parser = argparse.ArgumentParser(description="Install the enhanced PDF converter's dependencies.")
+    parser.add_argument(
+        "-v", "--verbose", action="store_true", help="show the installers' output as they run"
+    )
+    args = parser.parse_args()
+    
     print("🚀 Enhanced PDF Converter Setup")
     print("=" * 50)
     
@@ -162,21 +258,32 @@ def main():
     if not check_python_version():
         return 1
     
-    # Install dependencies
-    if not install_dependencies():
-        print("\n❌ Dependency installation failed")
-        return 1
-    
-    # Install markitdown
-    if not install_markitdown():
-        print("\n❌ MarkItDown installation failed")
-        return 1
+    # Nothing to install if the environment is as the last successful setup left it
+    fingerprint = environment_fingerprint()
+    if fingerprint is not None and fingerprint == load_cached_fingerprint():
+        print("\n⏭️  Environment unchanged since the last setup, skipping installation")
+        print(f"   (delete {SETUP_CACHE_FILE} to force a reinstall)")
+    else:
+        # Install dependencies
+        if not install_dependencies(verbose=args.verbose):
+            print("\n❌ Dependency installation failed")
+            return 1
+        
+        # Install markitdown
+        if not install_markitdown(verbose=args.verbose):
+            print("\n❌ MarkItDown installation failed")
+            return 1
     
     # Verify installation
     if not verify_installation():
         print("\n❌ Installation verification failed")
         return 1
     
+    # Remember the environment as it is now, after the installs
+    fingerprint = environment_fingerprint()
+    if fingerprint is not None:
+        SETUP_CACHE_FILE.write_text(json.dumps({"fingerprint": fingerprint}), encoding="utf-8")
+    
     # Setup test environment
     setup_test_environment()
     
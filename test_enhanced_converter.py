@@ -6,34 +6,40 @@ This script demonstrates how to use the enhanced PDF converter to extract
 figures and tables from academic PDFs with an interactive selection interface.
 """
 
+import heapq
 import os
 import sys
-from pathlib import Path
+import traceback
 
-# Add the markitdown package to the path
-markitdown_path = Path(__file__).parent / "markitdown-image-seperator/packages/markitdown/src"
-sys.path.insert(0, str(markitdown_path))
+# Puts the markitdown package on the path
+import _paths  # noqa: F401
 
 from markitdown import MarkItDown
 from markitdown.converters import EnhancedPdfConverter
 
+# Input and output locations, kept as plain strings since that is what
+# MarkItDown.convert and the os functions take
+SAMPLE_PDF = os.path.join("sample", "unconverted-[name-of-paper].pdf")
+OUTPUT_DIR = "test_output"
+
+# Longest file listing printed; larger directories show the first names only
+MAX_LISTED = 50
+
 def test_enhanced_pdf_converter():
     """Test the enhanced PDF converter with the sample PDF."""
     
     # Check if sample PDF exists
-    sample_pdf = Path("./sample/unconverted-[name-of-paper].pdf")
-    if not sample_pdf.exists():
-        print(f"Sample PDF not found at: {sample_pdf}")
+    if not os.path.exists(SAMPLE_PDF):
+        print(f"Sample PDF not found at: {SAMPLE_PDF}")
         print("Please ensure the sample PDF is in the correct location.")
         return False
     
     # Create output directory
-    output_dir = Path("./test_output")
-    output_dir.mkdir(exist_ok=True)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
     
     print("🚀 Testing Enhanced PDF Converter")
-    print(f"📄 Input PDF: {sample_pdf}")
-    print(f"📁 Output Directory: {output_dir}")
+    print(f"📄 Input PDF: {SAMPLE_PDF}")
+    print(f"📁 Output Directory: {OUTPUT_DIR}")
     print("-" * 50)
     
     try:
@@ -49,8 +55,8 @@ def test_enhanced_pdf_converter():
         # Convert the PDF
         print("🔄 Starting PDF conversion...")
         result = markitdown.convert(
-            str(sample_pdf),
-            output_dir=str(output_dir)
+            SAMPLE_PDF,
+            output_dir=OUTPUT_DIR
         )
         
         print("✅ PDF conversion completed!")
@@ -58,31 +64,39 @@ def test_enhanced_pdf_converter():
         print(f"📄 Content length: {len(result.markdown)} characters")
         
         # Save the main content
-        output_file = output_dir / "converted-output.md"
+        output_file = os.path.join(OUTPUT_DIR, "converted-output.md")
         with open(output_file, "w", encoding="utf-8") as f:
             f.write(result.markdown)
         
         print(f"💾 Main content saved to: {output_file}")
         
-        # Check what files were created
+        # Check what files were created (scandir entries carry their type, so
+        # only the size needs a stat call)
         print("\n📂 Generated files:")
-        for file in sorted(output_dir.glob("*")):
-            if file.is_file():
-                print(f"  - {file.name} ({file.stat().st_size} bytes)")
+        with os.scandir(OUTPUT_DIR) as entries:
+            files = [entry for entry in entries if entry.is_file()]
+        # nsmallest only orders the names that are printed
+        for entry in heapq.nsmallest(MAX_LISTED, files, key=lambda entry: entry.name):
+            print(f"  - {entry.name} ({entry.stat().st_size} bytes)")
+        if len(files) > MAX_LISTED:
+            print(f"  ... and {len(files) - MAX_LISTED} more")
         
-        # Check images directory
-        images_dir = output_dir / "images"
-        if images_dir.exists():
-            print(f"\n🖼️  Images extracted ({len(list(images_dir.glob('*')))} files):")
-            for img in sorted(images_dir.glob("*")):
-                print(f"  - {img.name}")
+        # Check images directory, listing it once for both the count and the names
+        images_dir = os.path.join(OUTPUT_DIR, "images")
+        if os.path.exists(images_dir):
+            with os.scandir(images_dir) as entries:
+                image_names = [entry.name for entry in entries]
+            print(f"\n🖼️  Images extracted ({len(image_names)} files):")
+            for name in heapq.nsmallest(MAX_LISTED, image_names):
+                print(f"  - {name}")
+            if len(image_names) > MAX_LISTED:
+                print(f"  ... and {len(image_names) - MAX_LISTED} more")
         
         print("\n🎉 Test completed successfully!")
         return True
         
     except Exception as e:
         print(f"❌ Error during conversion: {e}")
-        import traceback
         traceback.print_exc()
         return False
 
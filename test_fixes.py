@@ -9,12 +9,16 @@ This tests:
 """
 
 import os
+import re
 import sys
-from pathlib import Path
+import traceback
 
-# Add the markitdown package to the path
-markitdown_path = Path(__file__).parent / "markitdown-image-seperator/packages/markitdown/src"
-sys.path.insert(0, str(markitdown_path))
+# Puts the markitdown package on the path
+import _paths  # noqa: F401
+
+# Figure, image and table references (e.g. "Figure 1", "Table 2.1"), matched in
+# a single pass over each text
+_FIG_RE = re.compile(r'\b(?P<kind>Figure|Image|Table)\s+(?P<num>\d+(?:\.\d+)?)\b', re.IGNORECASE)
 
 def test_markdown_processing():
     """Test that markdown processing correctly inserts image references."""
@@ -61,7 +65,7 @@ Figure 1 shows the experimental setup clearly.
         }
         
         # Process the text
-        result = converter._process_text_with_images(test_text, filename_map)
+        result = converter._process_text_with_images(test_text, filename_map, converter.selected_items)
         
         print("✅ Markdown processing test:")
         print("Input text references found:")
@@ -82,11 +86,10 @@ Figure 1 shows the experimental setup clearly.
         # Show processed result
         print("\n📄 Processed markdown preview:")
         print("-" * 30)
-        print(result[:500] + "..." if len(result) > 500 else result)
+        print(f"{result[:500]}{'...' if len(result) > 500 else ''}")
         
     except Exception as e:
         print(f"❌ Error in markdown processing test: {e}")
-        import traceback
         traceback.print_exc()
 
 def test_gui_elements():
@@ -95,6 +98,12 @@ def test_gui_elements():
     print("\n🎨 Testing GUI Elements and Styling")
     print("-" * 50)
     
+    # Without a display Tk cannot open a window (X11 only; Windows and macOS
+    # always have one)
+    if sys.platform not in ("win32", "darwin") and not os.environ.get("DISPLAY"):
+        print("ℹ️  Skipping GUI test (no display available)")
+        return
+    
     try:
         import tkinter as tk
         from markitdown.converters._pdf_enhanced_converter import PDFImageExtractor
@@ -132,14 +141,14 @@ def test_gui_elements():
         test_canvas.pack(pady=5, fill=tk.X)
         test_canvas.create_text(50, 50, text="Canvas Test", fill="black")
         
+        # Draw the window once, without running the event loop, then close it
+        root.update_idletasks()
+        root.update()
+        root.destroy()
+        
         print("✅ GUI elements created successfully")
         print("✅ All elements have white background")
         print("✅ Text is black on white background")
-        print("ℹ️  Close the test window to continue...")
-        
-        # Show the test window briefly
-        root.after(3000, root.destroy)  # Auto-close after 3 seconds
-        root.mainloop()
         
     except Exception as e:
         print(f"❌ Error in GUI test: {e}")
@@ -150,15 +159,6 @@ def test_text_detection():
     print("\n🔍 Testing Text Detection Patterns")
     print("-" * 50)
     
-    import re
-    
-    # Test patterns
-    patterns = [
-        r'\bFigure\s+(\d+(?:\.\d+)?)\b',
-        r'\bImage\s+(\d+(?:\.\d+)?)\b',
-        r'\bTable\s+(\d+(?:\.\d+)?)\b',
-    ]
-    
     test_texts = [
         "Figure 1 shows the results.",
         "Table 2.1 contains the data.",
@@ -171,14 +171,12 @@ def test_text_detection():
     
     for text in test_texts:
         print(f"\nTesting: '{text}'")
-        for pattern in patterns:
-            matches = re.finditer(pattern, text, re.IGNORECASE)
-            for match in matches:
-                ref_type = match.group(0).split()[0].lower()
-                ref_number = match.group(1)
-                proper_name = f"{ref_type}{ref_number}"
-                print(f"  ✅ Found: {match.group(0)} → {proper_name}")
-                detected_count += 1
+        for match in _FIG_RE.finditer(text):
+            ref_type = match['kind'].lower()
+            ref_number = match['num']
+            proper_name = f"{ref_type}{ref_number}"
+            print(f"  ✅ Found: {match.group(0)} → {proper_name}")
+            detected_count += 1
     
     print(f"\n📊 Total references detected: {detected_count}")
     